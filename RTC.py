@@ -209,3 +209,18 @@ def read_date():
 
     return str_date
 
+
+# Read the date and time as numbers, for timestamping readings
+def read_datetime():
+    # Read Values
+    read_value()
+
+    # Convert numbers to Decimal
+    dec_years = bcd_to_dec(currentYear, RTC_YEAR_REG)
+    dec_months = bcd_to_dec(currentMonth, RTC_MONTH_REG)
+    dec_day = bcd_to_dec(currentDay, RTC_DAY_REG)
+    dec_hours = bcd_to_dec(currentHours, RTC_HOURS_REG)
+    dec_minutes = bcd_to_dec(currentMinutes, RTC_MINUTES_REG)
+    dec_seconds = bcd_to_dec(currentSeconds, RTC_SECONDS_REG)
+
+    return dec_years, dec_months, dec_day, dec_hours, dec_minutes, dec_seconds
@@ -0,0 +1,202 @@
+from microbit import sleep
+import cache
+
+# Channels recorded for every reading
+CHANNELS = ("temperature", "humidity", "pressure", "gasResistance", "iaq")
+
+# Percentiles tracked for every channel
+PERCENTILES = (0.5, 0.9)
+
+# Window lengths, as the number of leading fields of the RTC timestamp (year, month, day, hours, minutes, seconds)
+MINUTE = 5
+HOUR = 4
+PERIOD_NAMES = {MINUTE: "minute", HOUR: "hour"}
+
+
+# Readings kept per channel for exact percentiles, before switching to the approximate ones
+# Enough for a minute window at the default 1s interval, so only longer windows are approximate
+EXACT_SAMPLES = 64
+
+
+# Exact percentile of sorted values, by nearest rank
+def percentile(values, p):
+    return values[round(p * (len(values) - 1))]
+
+
+# Approximate quantile using the P-square algorithm (Jain & Chlamtac), constant memory of 5 markers
+# The markers start from a sorted list of the first readings, so they can begin in their desired positions
+class Quantile:
+    def __init__(self, p, values):
+        self.p = p
+        count = len(values)
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+        self.desired = [1 + (count - 1) * increment for increment in self.increments]
+
+        # Marker positions have to be distinct, in 1 to count
+        self.positions = []
+        for i in range(5):
+            position = round(self.desired[i])
+            if i > 0 and position <= self.positions[i - 1]:
+                position = self.positions[i - 1] + 1
+            if position > count - (4 - i):
+                position = count - (4 - i)
+            self.positions.append(position)
+        self.heights = [values[position - 1] for position in self.positions]
+
+    def add(self, value):
+        q = self.heights
+        n = self.positions
+
+        # Find the cell the new value falls into, extending the end markers if needed
+        if value < q[0]:
+            q[0] = value
+            k = 0
+        elif value >= q[4]:
+            q[4] = value
+            k = 3
+        else:
+            k = 0
+            while value >= q[k + 1]:
+                k += 1
+
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # Adjust the middle markers if they have drifted from their desired positions
+        for i in range(1, 4):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                height = self.parabolic(i, d)
+                if not (q[i - 1] < height < q[i + 1]):
+                    height = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = height
+                n[i] += d
+
+    def parabolic(self, i, d):
+        q = self.heights
+        n = self.positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * ((n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                                                   + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+
+    def value(self):
+        return self.heights[2]
+
+
+# Running count, min, max, mean and variance (Welford's algorithm) plus percentiles for one channel
+# Percentiles are exact for the first EXACT_SAMPLES readings, then approximate
+class Stats:
+    def __init__(self, percentiles=PERCENTILES):
+        self.count = 0
+        self.mean = 0
+        self.m2 = 0
+        self.min = None
+        self.max = None
+        self.percentiles = percentiles
+        self.samples = []
+        self.quantiles = None
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+        if self.quantiles is not None:
+            for quantile in self.quantiles:
+                quantile.add(value)
+            return
+
+        self.samples.append(value)
+        if len(self.samples) >= EXACT_SAMPLES:
+            # Switch to the approximate percentiles and free the readings
+            self.samples.sort()
+            self.quantiles = [Quantile(p, self.samples) for p in self.percentiles]
+            self.samples = None
+
+    def summary(self):
+        result = {
+            "count": self.count,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.mean,
+            "variance": self.m2 / (self.count - 1) if self.count > 1 else 0,
+        }
+        if self.quantiles is not None:
+            for quantile in self.quantiles:
+                result["p{}".format(round(quantile.p * 100))] = quantile.value()
+        else:
+            values = sorted(self.samples)
+            for p in self.percentiles:
+                result["p{}".format(round(p * 100))] = percentile(values, p) if values else None
+        return result
+
+
+# Take readings from the sensor, yielding (timestamp, reading) pairs
+# Readings come from the shared cache, so other users of the cache do not trigger extra conversions
+# The sensor (and gas sensor) and RTC must be initialised first
+def sample(interval=1000):
+    last = None
+    while True:
+        # Never the reading already yielded, so it is not counted twice
+        reading = cache.read_cached(interval, last)
+        last = reading
+        yield reading["time"], reading
+        sleep(interval)
+
+
+# Build the summary of a closed window
+def close_window(period, start, stats):
+    channels = {}
+    for name in stats:
+        channels[name] = stats[name].summary()
+    return {"period": PERIOD_NAMES.get(period, period), "start": start, "channels": channels}
+
+
+# Fold (timestamp, reading) pairs into windows of each period, yielding every window as it closes
+# Only the open window of each period is held, so memory does not grow with the number of readings
+def aggregate(readings, periods=(MINUTE, HOUR), percentiles=PERCENTILES):
+    starts = [None] * len(periods)
+    windows = [None] * len(periods)
+
+    for timestamp, reading in readings:
+        for i in range(len(periods)):
+            start = timestamp[:periods[i]]
+            if windows[i] is not None and start != starts[i]:
+                yield close_window(periods[i], starts[i], windows[i])
+                windows[i] = None
+
+            if windows[i] is None:
+                starts[i] = start
+                windows[i] = {}
+                for name in CHANNELS:
+                    windows[i][name] = Stats(percentiles)
+
+            for name in CHANNELS:
+                if name in reading:
+                    windows[i][name].add(reading[name])
+
+    # Out of readings, so close the windows that are still open
+    for i in range(len(periods)):
+        if windows[i] is not None:
+            yield close_window(periods[i], starts[i], windows[i])
+
+
+# Print a closed window, one line per channel
+def print_sink(window):
+    print("{} {}".format(window["period"], window["start"]))
+    for name in CHANNELS:
+        print(name, window["channels"][name])
+
+
+# Sample the sensor forever, passing each closed window to the sink
+def run(sink=print_sink, interval=1000, periods=(MINUTE, HOUR)):
+    for window in aggregate(sample(interval), periods):
+        sink(window)
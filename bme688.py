@@ -47,6 +47,20 @@ IIR_1 = 0x01
 IIR_3 = 0x02
 IIR_7 = 0x03
 
+# Measurement cycles for each oversampling rate (skipped, 1x, 2x, 4x, 8x, 16x)
+OSRS_CYCLES = (0, 1, 2, 4, 8, 16)
+
+# Adaptive oversampling
+ADAPT_SHIFT = 3     # Smoothing of the running noise estimate, weight of each new sample is 1/8
+ADAPT_HOLD = 16     # Samples to wait after a settings change before changing again
+# Variance of each reading below which it is quiet, and above which it is noisy
+TEMP_QUIET = 4          # (hundredths of °C)^2
+TEMP_NOISY = 100
+PRESS_QUIET = 4         # Pa^2
+PRESS_NOISY = 64
+HUMID_QUIET = 10000     # (thousandths of %)^2
+HUMID_NOISY = 250000
+
 def get_uint8(reg):
     i2c.write(CHIP_ADDRESS, bytearray([reg]))
     return i2c.read(CHIP_ADDRESS, 1)[0]
@@ -104,6 +118,25 @@ humidityRaw = 0
 gasResRaw = 0
 gasRange = 0
 
+# Current oversampling and filter settings
+osrsH = OSRS_2X
+osrsT = OSRS_2X
+osrsP = OSRS_16X
+iirFilter = IIR_3
+gasHeaterTime = 0   # Heater on time in ms, 0 until the gas sensor is initialised
+
+adaptive = False
+adaptiveRestore = None  # Settings to go back to when adaptive oversampling is turned off
+# Running noise estimate for temperature, pressure and humidity: [mean x16, variance x256, samples since last change]
+noiseStats = [[0, 0, 0], [0, 0, 0], [0, 0, 0]]
+
+
+# Integer division truncating towards zero, matching C as used in the Bosch reference code
+def div_trunc(a, b):
+    q = abs(a) // abs(b)
+    if (a < 0) != (b < 0):
+        q = -q
+    return q
 
 def calc_t_fine():
     var1 = (tempRaw >> 3) - (PAR_T1 << 1)
@@ -113,14 +146,17 @@ def calc_t_fine():
 
     return t_fine
 
-# temperature in degrees C
-def calc_temperature():
+# temperature in hundredths of degrees C (int)
+def calc_temperature_int():
     t_fine = calc_t_fine()
     temp = ((t_fine * 5) + 128) >> 8
-    temp = temp / 100 # Converting to floating point with 2 dp
 
     return temp
 
+# temperature in degrees C
+def calc_temperature():
+    return calc_temperature_int() / 100 # Converting to floating point with 2 dp
+
 # pressure in pascals (int)
 # needs t_fine
 def calc_pressure():
@@ -137,10 +173,10 @@ def calc_pressure():
     pRead = ((pRead - (var2 >> 12)) * 3125)
 
     if (pRead >= (1 << 30)):
-        pRead = math.floor(pRead / var1) << 1
+        pRead = div_trunc(pRead, var1) << 1
 
     else:
-        pRead = math.floor((pRead << 1) / var1)
+        pRead = div_trunc(pRead << 1, var1)
 
     var1 = (PAR_P9 * (((pRead >> 3) * (pRead >> 3)) >> 13)) >> 12
     var2 = ((pRead >> 2) * PAR_P8) >> 13
@@ -149,33 +185,47 @@ def calc_pressure():
 
     return pRead
 
+# humidity in thousandths of a percent (int)
+# needs t_fine, scaled to hundredths of degrees C
+def calc_humidity_int():
+    tempScaled = calc_temperature_int()
 
-def calc_humidity():
-    temp = calc_temperature()
-
-    var1 = humidityRaw - (PAR_H1 << 4) - (math.floor((temp * PAR_H3) / 100) >> 1)
-    var2 = (PAR_H2 * (math.floor((temp * PAR_H4) / 100) + math.floor((math.floor(temp * (math.floor((temp * PAR_H5) / 100))) >> 6) / 100) + ((1 << 14)))) >> 10
+    var1 = humidityRaw - (PAR_H1 << 4) - (div_trunc(tempScaled * PAR_H3, 100) >> 1)
+    var2 = (PAR_H2 * (div_trunc(tempScaled * PAR_H4, 100) + div_trunc((tempScaled * div_trunc(tempScaled * PAR_H5, 100)) >> 6, 100) + (1 << 14))) >> 10
     var3 = var1 * var2
-    var4 = ((PAR_H6 << 7) + (math.floor((temp * PAR_H7) / 100))) >> 4
+    var4 = ((PAR_H6 << 7) + div_trunc(tempScaled * PAR_H7, 100)) >> 4
     var5 = ((var3 >> 14) * (var3 >> 14)) >> 10
     var6 = (var4 * var5) >> 1
-    hRead = (var3 + var6) >> 12
-    hRead = (((var3 + var6) >> 10) * (1000)) >> 12
-    hRead = math.floor(hRead / 1000)
+    hRead = (((var3 + var6) >> 10) * 1000) >> 12
+
+    # Limit to the 0 - 100% range
+    if hRead > 100000:
+        hRead = 100000
+    elif hRead < 0:
+        hRead = 0
 
     return hRead
 
+# humidity in percent
+def calc_humidity():
+    return calc_humidity_int() / 1000 # Converting to floating point with 3 dp
+
 
 def convert_gas_target_temp(targetTemp):
-    temp = calc_temperature()
+    # Ambient temperature in whole degrees C, from t_fine
+    ambTemp = div_trunc(calc_temperature_int(), 100)
+
+    # Heater cannot go above 400°C
+    if targetTemp > 400:
+        targetTemp = 400
 
-    var1 = math.floor((temp * PAR_G3) / 10) << 8
-    var2 = (PAR_G1 + 784) * math.floor((math.floor(((PAR_G2 + 154009) * targetTemp * 5) / 100) + 3276800) / 10)
+    var1 = div_trunc(ambTemp * PAR_G3, 1000) << 8
+    var2 = (PAR_G1 + 784) * div_trunc(div_trunc((PAR_G2 + 154009) * targetTemp * 5, 100) + 3276800, 10)
     var3 = var1 + (var2 >> 1)
-    var4 = math.floor(var3 / (RES_HEAT_RANGE + 4))
+    var4 = div_trunc(var3, RES_HEAT_RANGE + 4)
     var5 = (131 * RES_HEAT_VAL) + 65536                 # Target heater resistance in Ohms
-    resHeatX100 = ((math.floor(var4 / var5) - 250) * 34)
-    resHeat = math.floor((resHeatX100 + 50) / 100)
+    resHeatX100 = ((div_trunc(var4, var5) - 250) * 34)
+    resHeat = div_trunc(resHeatX100 + 50, 100) & 0xFF
 
     return resHeat
 
@@ -183,7 +233,7 @@ def convert_gas_target_temp(targetTemp):
 def calc_gas_resistance():
     var1 = 262144 >> gasRange
     var2 = 4096 + ((gasResRaw - 512) * 3)
-    calcGasRes = math.floor((10000 * var1) / var2)
+    calcGasRes = (10000 * var1) // var2
 
     gRes = calcGasRes * 100
 
@@ -191,6 +241,8 @@ def calc_gas_resistance():
 
 
 def init_gas_sensor():
+    global gasHeaterTime
+
     # Define the target heater resistance from temperature (Heater Step 0)
     i2c_write(0x5A, convert_gas_target_temp(300))     # Write the target temperature (300°C) to res_wait_0 register - heater step 0
 
@@ -198,6 +250,7 @@ def init_gas_sensor():
     # Bits <7:6> are a multiplier (1, 4, 16 or 64 times)    Bits <5:0> are 1ms steps (0 to 63ms)
     # i2cWrite(0x64, 101)        # Write the coded duration (101) of 150ms to gas_wait_0 register - heater step 0
     i2c_write(0x64, 109)        # Write the coded duration (109) of 180ms to gas_wait_0 register - heater step 0
+    gasHeaterTime = 180
 
     # Select index of heater step (0 to 9): CTRL_GAS_1 reg <3:0>    (Make sure to combine with gas enable setting already there)
     gasEnable = (get_uint8(write_buf[0]) & 0x20)
@@ -311,17 +364,125 @@ def init_sensor():
     i2c_write(RESET, 0xB6)
     sleep(1000)
     i2c_write(CTRL_MEAS, 0x00)
-    i2c_write(CTRL_HUM, OSRS_2X)
-    i2c_write(CTRL_MEAS, (OSRS_2X << 5) | (OSRS_16X << 2))
-    i2c_write(CONFIG, IIR_3 << 2)
+    set_oversampling(OSRS_2X, OSRS_2X, OSRS_16X, IIR_3)
     i2c_write(CTRL_GAS_1, 0x20)
 
 
+# Set the oversampling rates of humidity, temperature and pressure, and the IIR filter coefficient
+def set_oversampling(hum, temp, press, iir):
+    global osrsH, osrsT, osrsP, iirFilter
+    osrsH = hum
+    osrsT = temp
+    osrsP = press
+    iirFilter = iir
+
+    i2c_write(CTRL_HUM, osrsH)                          # Humidity setting only takes effect after writing CTRL_MEAS
+    i2c_write(CTRL_MEAS, (osrsT << 5) | (osrsP << 2))   # Sleep mode
+    i2c_write(CONFIG, iirFilter << 2)
+
+
+# Time for one reading with the current settings, in microseconds (see Bosch BME68x API bme68x_get_meas_dur)
+def calc_conversion_time():
+    cycles = OSRS_CYCLES[osrsT] + OSRS_CYCLES[osrsP] + OSRS_CYCLES[osrsH]
+    convTime = cycles * 1963
+    convTime += 477 * 4         # Temperature, pressure and humidity switching
+    convTime += 477 * 5         # Gas measurement
+    convTime += 1000            # Wake up in forced mode
+    convTime += gasHeaterTime * 1000
+
+    return convTime
+
+
+# Current settings and the resulting conversion time in microseconds
+def read_oversampling():
+    return osrsH, osrsT, osrsP, iirFilter, calc_conversion_time()
+
+
+# Turn adaptive oversampling on or off
+# When on, each reading lowers the oversampling of quiet signals and raises it for noisy ones
+# Turning it off goes back to the settings from when it was turned on
+def enable_adaptive(enabled=True):
+    global adaptive, adaptiveRestore
+    if enabled and not adaptive:
+        adaptiveRestore = (osrsH, osrsT, osrsP, iirFilter)
+    elif not enabled and adaptive:
+        set_oversampling(*adaptiveRestore)
+    adaptive = enabled
+    for stats in noiseStats:
+        stats[2] = 0
+
+
+# Update the running noise estimate of a channel with a new integer reading
+def update_noise(stats, value):
+    value = value << 4
+    if stats[2] == 0:
+        stats[0] = value
+        stats[1] = 0
+    delta = value - stats[0]
+    stats[0] += delta >> ADAPT_SHIFT
+    stats[1] += ((delta * delta) - stats[1]) >> ADAPT_SHIFT
+    stats[2] += 1
+
+
+# Returns -1 to lower the oversampling, 1 to raise it or 0 to leave it
+def noise_step(stats, quiet, noisy):
+    if stats[2] < ADAPT_HOLD:
+        return 0
+    variance = stats[1] >> 8
+    if variance < quiet:
+        return -1
+    if variance > noisy:
+        return 1
+    return 0
+
+
+def adapt_oversampling():
+    tempStats, pressStats, humidStats = noiseStats
+    update_noise(tempStats, calc_temperature_int())
+    update_noise(pressStats, calc_pressure())
+    update_noise(humidStats, calc_humidity_int())
+
+    temp = min(max(osrsT + noise_step(tempStats, TEMP_QUIET, TEMP_NOISY), OSRS_1X), OSRS_16X)
+    hum = min(max(osrsH + noise_step(humidStats, HUMID_QUIET, HUMID_NOISY), OSRS_1X), OSRS_16X)
+
+    # Pressure steps through the IIR filter up to IIR_3 at 1x, then the oversampling rates, then the IIR filter again at 16x
+    # The IIR filter does not change the conversion time, it trades noise for how quickly readings follow real changes:
+    # past 16x it is the only way left to reduce noise, and below 1x a quiet signal can do without the lag
+    press = osrsP
+    iir = iirFilter
+    step = noise_step(pressStats, PRESS_QUIET, PRESS_NOISY)
+    if step > 0:
+        if press == OSRS_1X and iir < IIR_3:
+            iir += 1
+        elif press < OSRS_16X:
+            press += 1
+        elif iir < IIR_7:
+            iir += 1
+    elif step < 0:
+        if press == OSRS_16X and iir > IIR_3:
+            iir -= 1
+        elif press > OSRS_1X:
+            press -= 1
+        elif iir > IIR_0:
+            iir -= 1
+
+    if temp != osrsT:
+        tempStats[2] = 0
+    if hum != osrsH:
+        humidStats[2] = 0
+    if press != osrsP or iir != iirFilter:
+        pressStats[2] = 0
+    if iir != iirFilter:
+        tempStats[2] = 0        # The IIR filter applies to temperature as well
+
+    if (hum, temp, press, iir) != (osrsH, osrsT, osrsP, iirFilter):
+        set_oversampling(hum, temp, press, iir)
+
+
 def read_data_registers():
     global tempRaw, pressureRaw, humidityRaw, gasResRaw, gasRange, measTime
 
-    o_sample_tp = get_uint8(write_buf[0])
-    i2c_write(CTRL_MEAS, 0x01 | o_sample_tp)
+    i2c_write(CTRL_MEAS, (osrsT << 5) | (osrsP << 2) | 0x01)   # Forced mode with the current oversampling
     write_buf[0] = MEAS_STATUS_0
     new_data = (get_uint8(write_buf[0]) & 0x80) >> 7
     while new_data != 1:
@@ -335,6 +496,9 @@ def read_data_registers():
     gasRange = get_uint8(GAS_RES_LSB_0) & 0x0F
     measTime = running_time()
 
+    if adaptive:
+        adapt_oversampling()
+
 # initialise()
 # init_gas_sensor()
 # read_data_registers()
@@ -0,0 +1,89 @@
+from microbit import running_time
+import bme688
+import RTC
+
+# Readings older than this (in ms) are refreshed on the next request
+maxAge = 1000
+
+# Latest readings, shared by every caller
+reading = None
+readTime = 0
+
+# Counters
+requests = 0
+hits = 0
+conversions = 0
+totalLatency = 0
+maxLatency = 0
+
+
+def set_max_age(age):
+    global maxAge
+    maxAge = age
+
+
+# Take a new reading from the sensor and RTC and store it in the cache
+# The sensor (and gas sensor) and RTC must be initialised first
+def _refresh():
+    global reading, readTime, conversions
+
+    bme688.read_data_registers()
+    iaqScore, iaqPercent, eCO2Value = bme688.read_air_quality()
+    reading = {
+        "temperature": bme688.calc_temperature(),
+        "humidity": bme688.calc_humidity(),
+        "pressure": bme688.calc_pressure(),
+        "gasResistance": bme688.calc_gas_resistance(),
+        "iaq": iaqScore,
+        "iaqPercent": iaqPercent,
+        "eCO2": eCO2Value,
+        "time": RTC.read_datetime(),
+    }
+    readTime = running_time()
+    conversions += 1
+
+
+# Return the cached readings, only triggering a new conversion if they are older than the max age
+# Every caller within the max age shares the same conversion
+# Passing a previous reading makes sure a newer one is returned, for callers that must not see the same reading twice
+def read_cached(age=None, previous=None):
+    global requests, hits, totalLatency, maxLatency
+
+    if age is None:
+        age = maxAge
+
+    start = running_time()
+    requests += 1
+
+    if reading is None or reading is previous or start - readTime > age:
+        _refresh()
+    else:
+        hits += 1
+
+    latency = running_time() - start
+    totalLatency += latency
+    if latency > maxLatency:
+        maxLatency = latency
+
+    return reading
+
+
+# Request counters, latencies in ms
+def read_stats():
+    meanLatency = totalLatency / requests if requests > 0 else 0
+    return {
+        "requests": requests,
+        "hits": hits,
+        "conversions": conversions,
+        "meanLatency": meanLatency,
+        "maxLatency": maxLatency,
+    }
+
+
+def reset_stats():
+    global requests, hits, conversions, totalLatency, maxLatency
+    requests = 0
+    hits = 0
+    conversions = 0
+    totalLatency = 0
+    maxLatency = 0
@@ -0,0 +1,92 @@
+import random
+
+import aggregate
+
+
+def summary(values, percentiles=(0.5, 0.9)):
+    stats = aggregate.Stats(percentiles)
+    for value in values:
+        stats.add(value)
+    return stats.summary()
+
+
+def test_small_windows_exact_percentiles():
+    for count in range(1, 3 * aggregate.EXACT_SAMPLES):
+        values = list(range(1, count + 1))
+        result = summary(values)
+        assert result["count"] == count
+        assert result["min"] == 1
+        assert result["max"] == count
+        assert result["p90"] >= result["p50"]
+        if count < aggregate.EXACT_SAMPLES:
+            assert result["p50"] == aggregate.percentile(values, 0.5)
+            assert result["p90"] == aggregate.percentile(values, 0.9)
+
+
+def test_small_window_p90():
+    assert summary([1, 2, 3, 4, 5])["p90"] == 5
+    assert summary([1, 2, 3, 4, 5, 6])["p90"] == 5
+
+
+def test_empty_window():
+    result = summary([])
+    assert result["count"] == 0
+    assert result["p50"] is None
+    assert result["p90"] is None
+
+
+def test_mean_and_variance():
+    result = summary([2, 4, 4, 4, 5, 5, 7, 9])
+    assert result["mean"] == 5
+    assert abs(result["variance"] - 32 / 7) < 1e-9
+
+
+def test_minute_window_exact_at_default_interval():
+    rng = random.Random(60)
+    values = [rng.gauss(20, 2) for i in range(60)]
+    result = summary(values)
+    values.sort()
+    assert result["p50"] == aggregate.percentile(values, 0.5)
+    assert result["p90"] == aggregate.percentile(values, 0.9)
+
+
+def test_hour_window_approximate_percentiles():
+    # An hour of readings at the default interval, within 0.2 standard deviations
+    rng = random.Random(3600)
+    for trial in range(20):
+        values = [rng.gauss(0, 1) for i in range(3600)]
+        result = summary(values)
+        values.sort()
+        assert abs(result["p50"] - aggregate.percentile(values, 0.5)) < 0.2
+        assert abs(result["p90"] - aggregate.percentile(values, 0.9)) < 0.2
+
+
+def test_large_window_approximate_percentiles():
+    rng = random.Random(27)
+    values = [rng.gauss(20, 2) for i in range(20000)]
+    result = summary(values)
+    values.sort()
+    assert abs(result["p50"] - aggregate.percentile(values, 0.5)) < 0.05
+    assert abs(result["p90"] - aggregate.percentile(values, 0.9)) < 0.05
+
+
+def test_aggregate_windows():
+    readings = []
+    for hours in (0, 1):
+        for minutes in range(3):
+            for seconds in (0, 20, 40):
+                readings.append(((24, 1, 1, hours, minutes, seconds), {"temperature": minutes}))
+
+    windows = list(aggregate.aggregate(iter(readings)))
+    minutes = [w for w in windows if w["period"] == "minute"]
+    hours = [w for w in windows if w["period"] == "hour"]
+
+    # The last minute and hour are closed when the readings run out
+    assert [w["start"] for w in minutes] == [(24, 1, 1, h, m) for h in (0, 1) for m in range(3)]
+    assert [w["start"] for w in hours] == [(24, 1, 1, 0), (24, 1, 1, 1)]
+    for w in minutes:
+        assert w["channels"]["temperature"]["count"] == 3
+        assert w["channels"]["temperature"]["mean"] == w["start"][4]
+    for w in hours:
+        assert w["channels"]["temperature"]["count"] == 9
+        assert w["channels"]["humidity"]["count"] == 0
@@ -0,0 +1,211 @@
+import random
+
+import pytest
+
+import bme688
+from conftest import CALIBRATION
+
+
+@pytest.fixture(autouse=True)
+def raw_readings():
+    yield
+    bme688.tempRaw = 0
+    bme688.pressureRaw = 0
+    bme688.humidityRaw = 0
+    bme688.gasResRaw = 0
+    bme688.gasRange = 0
+
+
+def test_calibration_loaded():
+    for name, value in CALIBRATION.items():
+        assert getattr(bme688, name) == value, name
+
+
+# Bosch BME68x API floating point compensation, for comparison
+def float_t_fine(tempRaw):
+    c = CALIBRATION
+    var1 = ((tempRaw / 16384.0) - (c["PAR_T1"] / 1024.0)) * c["PAR_T2"]
+    var2 = (((tempRaw / 131072.0) - (c["PAR_T1"] / 8192.0)) ** 2) * (c["PAR_T3"] * 16.0)
+    return var1 + var2
+
+
+def float_temperature(tempRaw):
+    return float_t_fine(tempRaw) / 5120.0
+
+
+def float_pressure(tempRaw, pressureRaw):
+    c = CALIBRATION
+    var1 = (float_t_fine(tempRaw) / 2.0) - 64000.0
+    var2 = var1 * var1 * (c["PAR_P6"] / 131072.0)
+    var2 = var2 + (var1 * c["PAR_P5"] * 2.0)
+    var2 = (var2 / 4.0) + (c["PAR_P4"] * 65536.0)
+    var1 = (((c["PAR_P3"] * var1 * var1) / 16384.0) + (c["PAR_P2"] * var1)) / 524288.0
+    var1 = (1.0 + (var1 / 32768.0)) * c["PAR_P1"]
+    pressure = 1048576.0 - pressureRaw
+    pressure = ((pressure - (var2 / 4096.0)) * 6250.0) / var1
+    var1 = (c["PAR_P9"] * pressure * pressure) / 2147483648.0
+    var2 = pressure * (c["PAR_P8"] / 32768.0)
+    var3 = (pressure / 256.0) ** 3 * (c["PAR_P10"] / 131072.0)
+    return pressure + (var1 + var2 + var3 + (c["PAR_P7"] * 128.0)) / 16.0
+
+
+def float_humidity(tempRaw, humidityRaw):
+    c = CALIBRATION
+    temp = float_temperature(tempRaw)
+    var1 = humidityRaw - ((c["PAR_H1"] * 16.0) + ((c["PAR_H3"] / 2.0) * temp))
+    var2 = var1 * ((c["PAR_H2"] / 262144.0) * (1.0 + ((c["PAR_H4"] / 16384.0) * temp) + ((c["PAR_H5"] / 1048576.0) * temp * temp)))
+    var3 = c["PAR_H6"] / 16384.0
+    var4 = c["PAR_H7"] / 2097152.0
+    humidity = var2 + ((var3 + (var4 * temp)) * var2 * var2)
+    return min(max(humidity, 0.0), 100.0)
+
+
+def float_heater_resistance(ambTemp, targetTemp):
+    c = CALIBRATION
+    var1 = (c["PAR_G1"] / 16.0) + 49.0
+    var2 = ((c["PAR_G2"] / 32768.0) * 0.0005) + 0.00235
+    var3 = c["PAR_G3"] / 1024.0
+    var4 = var1 * (1.0 + (var2 * targetTemp))
+    var5 = var4 + (var3 * ambTemp)
+    return 3.4 * ((var5 * (4 / (4 + c["RES_HEAT_RANGE"])) * (1 / (1 + (c["RES_HEAT_VAL"] * 0.002)))) - 25)
+
+
+def float_gas_resistance(gasResRaw, gasRange):
+    var1 = 262144 >> gasRange
+    var2 = 4096.0 + ((gasResRaw - 512) * 3.0)
+    return 1000000.0 * var1 / var2
+
+
+# Raw temperature readings covering -40°C to 85°C with this calibration
+TEMP_RAW = range(300000, 640001)
+
+
+def test_temperature_matches_float():
+    for tempRaw in TEMP_RAW:
+        bme688.tempRaw = tempRaw
+        assert isinstance(bme688.calc_temperature_int(), int)
+        assert abs(bme688.calc_temperature() - float_temperature(tempRaw)) <= 0.01
+
+
+def test_humidity_matches_float():
+    rng = random.Random(688)
+    for i in range(200000):
+        bme688.tempRaw = rng.choice(TEMP_RAW)
+        bme688.humidityRaw = rng.randrange(0, 65536)
+        assert isinstance(bme688.calc_humidity_int(), int)
+        assert 0 <= bme688.calc_humidity_int() <= 100000
+        assert abs(bme688.calc_humidity() - float_humidity(bme688.tempRaw, bme688.humidityRaw)) <= 0.1
+
+
+def test_pressure_matches_float():
+    rng = random.Random(688)
+    for i in range(200000):
+        bme688.tempRaw = rng.choice(TEMP_RAW)
+        bme688.pressureRaw = rng.randrange(0, 1 << 20)
+        expected = float_pressure(bme688.tempRaw, bme688.pressureRaw)
+        if not 30000 <= expected <= 110000:
+            continue        # Outside the sensor's 300 - 1100 hPa operating range
+        pressure = bme688.calc_pressure()
+        assert isinstance(pressure, int)
+        # Within 0.1 hPa, well inside the sensor's absolute accuracy
+        assert abs(pressure - expected) <= 10
+
+
+def test_gas_resistance_matches_float():
+    for gasRange in range(16):
+        bme688.gasRange = gasRange
+        for gasResRaw in range(1024):
+            bme688.gasResRaw = gasResRaw
+            gasRes = bme688.calc_gas_resistance()
+            assert isinstance(gasRes, int)
+            expected = float_gas_resistance(gasResRaw, gasRange)
+            assert expected - 100 < gasRes <= expected + 1e-6 * expected
+
+
+def test_heater_resistance_matches_float():
+    # Ambient temperature is used in whole degrees, so a coarser sweep covers every value
+    for tempRaw in TEMP_RAW[::500]:
+        bme688.tempRaw = tempRaw
+        ambTemp = bme688.div_trunc(bme688.calc_temperature_int(), 100)
+        for targetTemp in range(200, 401, 10):
+            resHeat = bme688.convert_gas_target_temp(targetTemp)
+            assert 0 <= resHeat <= 0xFF
+            # The Bosch integer and floating point heater formulas are separate approximations
+            assert abs(resHeat - float_heater_resistance(ambTemp, targetTemp)) <= 4
+
+
+def test_heater_target_clamped():
+    bme688.tempRaw = 500000
+    assert bme688.convert_gas_target_temp(500) == bme688.convert_gas_target_temp(400)
+
+
+def test_div_trunc():
+    for a in range(-20, 21):
+        for b in (-7, -3, -1, 1, 3, 7):
+            assert bme688.div_trunc(a, b) == int(a / b)
+
+
+@pytest.fixture
+def adaptive_state():
+    bme688.set_oversampling(bme688.OSRS_2X, bme688.OSRS_2X, bme688.OSRS_16X, bme688.IIR_3)
+    yield
+    bme688.enable_adaptive(False)
+    bme688.set_oversampling(bme688.OSRS_2X, bme688.OSRS_2X, bme688.OSRS_16X, bme688.IIR_3)
+
+
+# Feed readings alternating either side of a steady value, by the given raw amounts, through the adaptive oversampling
+def feed(count, tempNoise, pressNoise, humidNoise):
+    for i in range(count):
+        sign = 1 if i % 2 else -1
+        bme688.tempRaw = 500000 + sign * tempNoise
+        bme688.pressureRaw = 400000 + sign * pressNoise
+        bme688.humidityRaw = 25000 + sign * humidNoise
+        bme688.adapt_oversampling()
+
+
+def settings():
+    return bme688.read_oversampling()[:4]
+
+
+def test_adaptive_steps_down_when_quiet_and_up_when_noisy(adaptive_state):
+    bme688.enable_adaptive()
+    feed(200, 0, 0, 0)
+    assert settings() == (bme688.OSRS_1X, bme688.OSRS_1X, bme688.OSRS_1X, bme688.IIR_0)
+
+    # About 31 hundredths of °C, 34Pa and 1.4% either side
+    feed(300, 1000, 200, 200)
+    assert settings() == (bme688.OSRS_16X, bme688.OSRS_16X, bme688.OSRS_16X, bme688.IIR_7)
+
+
+def test_adaptive_holds_between_quiet_and_noisy(adaptive_state):
+    bme688.enable_adaptive()
+    # About 4 hundredths of °C (and 5Pa through the temperature compensation) and 0.25% either side
+    feed(200, 120, 0, 36)
+    assert settings() == (bme688.OSRS_2X, bme688.OSRS_2X, bme688.OSRS_16X, bme688.IIR_3)
+
+
+def test_adaptive_iir_change_resets_temperature(adaptive_state):
+    bme688.enable_adaptive()
+    # Temperature between quiet and noisy, pressure noisy at 16x so the IIR filter goes up
+    feed(bme688.ADAPT_HOLD, 120, 200, 36)
+    assert settings() == (bme688.OSRS_2X, bme688.OSRS_2X, bme688.OSRS_16X, bme688.IIR_7)
+    assert bme688.noiseStats[0][2] == 0
+
+
+def test_adaptive_off_restores_settings(adaptive_state):
+    bme688.set_oversampling(bme688.OSRS_4X, bme688.OSRS_2X, bme688.OSRS_8X, bme688.IIR_1)
+    bme688.enable_adaptive()
+    bme688.enable_adaptive()
+    feed(200, 0, 0, 0)
+    assert settings() == (bme688.OSRS_1X, bme688.OSRS_1X, bme688.OSRS_1X, bme688.IIR_0)
+    bme688.enable_adaptive(False)
+    assert settings() == (bme688.OSRS_4X, bme688.OSRS_2X, bme688.OSRS_8X, bme688.IIR_1)
+
+
+def test_conversion_time_follows_oversampling(adaptive_state):
+    bme688.set_oversampling(bme688.OSRS_1X, bme688.OSRS_1X, bme688.OSRS_1X, bme688.IIR_3)
+    fast = bme688.calc_conversion_time()
+    bme688.set_oversampling(bme688.OSRS_1X, bme688.OSRS_1X, bme688.OSRS_16X, bme688.IIR_3)
+    assert bme688.calc_conversion_time() - fast == 15 * 1963
+    bme688.set_oversampling(bme688.OSRS_1X, bme688.OSRS_1X, bme688.OSRS_16X, bme688.IIR_7)
+    assert bme688.calc_conversion_time() - fast == 15 * 1963
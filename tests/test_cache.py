@@ -0,0 +1,71 @@
+import pytest
+
+import aggregate
+import bme688
+import cache
+from conftest import registers
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    now = [0]
+    registers[0x1D] = 0x80                  # New data ready
+    registers[0x22:0x26] = bytes([0x7A, 0x12, 0x00, 0x60])   # Temperature and humidity readings
+    monkeypatch.setattr(cache, "running_time", lambda: now[0])
+    monkeypatch.setattr(cache, "reading", None)
+    monkeypatch.setattr(cache, "readTime", 0)
+    cache.reset_stats()
+
+    def sleep(ms):
+        now[0] += ms
+    monkeypatch.setattr(aggregate, "sleep", sleep)
+    return now
+
+
+def test_read_cached_shares_reading(clock):
+    first = cache.read_cached()
+    assert cache.read_cached() is first
+    clock[0] += cache.maxAge
+    assert cache.read_cached() is first
+    clock[0] += 1
+    assert cache.read_cached() is not first
+
+    stats = cache.read_stats()
+    assert stats["requests"] == 4
+    assert stats["hits"] == 2
+    assert stats["conversions"] == 2
+
+
+def test_read_cached_newer_than_previous(clock):
+    first = cache.read_cached()
+    second = cache.read_cached(previous=first)
+    assert second is not first
+    assert cache.read_cached(previous=first) is second
+
+    stats = cache.read_stats()
+    assert stats["requests"] == 3
+    assert stats["hits"] == 1
+    assert stats["conversions"] == 2
+
+
+def test_sample_never_repeats_a_reading(clock, monkeypatch):
+    # Each conversion takes 30ms
+    convert = bme688.read_data_registers
+
+    def read_data_registers():
+        clock[0] += 30
+        convert()
+    monkeypatch.setattr(bme688, "read_data_registers", read_data_registers)
+
+    # Each sample comes exactly one interval after the last conversion
+    samples = aggregate.sample(970)
+    readings = [next(samples)[1] for i in range(6)]
+    for i in range(1, 6):
+        assert readings[i] is not readings[i - 1]
+
+    stats = cache.read_stats()
+    assert stats["requests"] == 6
+    assert stats["hits"] == 0
+    assert stats["conversions"] == 6
+    assert stats["meanLatency"] == 30
+    assert stats["maxLatency"] == 30